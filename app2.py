@@ -1,72 +1,179 @@
+import io
 import os
 import re
 import shutil
-import tempfile
+import zipfile
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from datetime import datetime
 
 from docx import Document
+from docx.oxml.ns import qn
+from lxml import etree
 
 # ==============================================================================
 # 1. CORE LOGIC (Modified to accept and return sequence number)
 # ==============================================================================
 
+_NSMAP = {
+    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+}
+# Compiled once: finds inline/anchored drawings and legacy VML pictures in C
+_HAS_GRAPHIC = etree.XPath('.//w:drawing|.//w:pict|.//a:graphic', namespaces=_NSMAP)
+_BLIP_EMBEDS = etree.XPath('.//a:blip/@r:embed', namespaces=_NSMAP)
+_W_P = qn('w:p')
+_W_T = qn('w:t')
+# The elements _HAS_GRAPHIC looks for, as iterparse tags
+_GRAPHIC_TAGS = (qn('w:drawing'), qn('w:pict'), '{%s}graphic' % _NSMAP['a'])
+_TWO_DIGITS = re.compile(r"\d\d").fullmatch
+
 def generate_icn_code(dmc_code, kpc, xyz, sq, icv, issue, sec):
-    parts = dmc_code.split("-")
-    subsystem_index = -1
-    for i in range(len(parts) - 1):
-        if re.fullmatch(r"\d{2}", parts[i]) and re.fullmatch(r"\d{2}", parts[i + 1]):
-            subsystem_index = i + 1
+    # Walk the dash-separated fields once, remembering where each field ends so
+    # the prefix up to the subsystem can be sliced straight out of dmc_code.
+    start, prev_is_pair = 0, False
+    while True:
+        end = dmc_code.find("-", start)
+        is_pair = _TWO_DIGITS(dmc_code[start:] if end == -1 else dmc_code[start:end]) is not None
+        if prev_is_pair and is_pair:
+            up_to_subsystem = dmc_code if end == -1 else dmc_code[:end]
+            return f"ICN-{up_to_subsystem}-{kpc}-{xyz}-{sq}-{icv}-{issue}-{sec}"
+        if end == -1:
+            return None
+        start, prev_is_pair = end + 1, is_pair
+
+# The helpers below read <w:t> nodes lazily and stop as soon as the answer is
+# known, instead of building and lowercasing the whole paragraph text.
+
+def contains_figure(p_elem):
+    tail = ""
+    for t in p_elem.iter(_W_T):
+        chunk = tail + (t.text or "").lower()
+        if "figure" in chunk:
+            return True
+        tail = chunk[-5:]  # "figure" may span two runs
+    return False
+
+def starts_with_figure(p_elem):
+    prefix = ""
+    for t in p_elem.iter(_W_T):
+        prefix = (prefix + (t.text or "")).lstrip()
+        if len(prefix) >= 6:
             break
-    if subsystem_index == -1:
-        return None
-    up_to_subsystem = "-".join(parts[:subsystem_index + 1])
-    return f"ICN-{up_to_subsystem}-{kpc}-{xyz}-{sq}-{icv}-{issue}-{sec}"
+    return prefix[:6].lower() == "figure"
+
+def has_text(p_elem):
+    return any(t.text and not t.text.isspace() for t in p_elem.iter(_W_T))
+
+def next_caption(p_elem, max_paragraphs=3):
+    # Walk the following <w:p> siblings directly in lxml (skipping tables etc.)
+    # and stop at the first one that has text
+    sib = p_elem.getnext()
+    while sib is not None and max_paragraphs:
+        if sib.tag == _W_P:
+            if has_text(sib):
+                return sib
+            max_paragraphs -= 1
+        sib = sib.getnext()
+    return None
+
+def iter_captioned_images(p_elems):
+    # Works on raw <w:p> elements; no python-docx Paragraph wrappers are built
+    for p in p_elems:
+        has_image = bool(_HAS_GRAPHIC(p))
+        if has_image:
+            if contains_figure(p):
+                yield p
+            else:
+                caption = next_caption(p)
+                if caption is not None and starts_with_figure(caption):
+                    yield p
+
+def has_graphics(input_path):
+    # Streams word/document.xml without python-docx and stops at the first
+    # drawing, picture or graphic, i.e. anything _HAS_GRAPHIC would match.
+    # Shapes and text boxes count even when the package has no media parts.
+    with zipfile.ZipFile(input_path) as zf:
+        try:
+            xml_stream = zf.open('word/document.xml')
+        except KeyError:
+            return True  # Unusual layout: let python-docx find the main part
+        with xml_stream:
+            for _ in etree.iterparse(xml_stream, events=('start',), tag=_GRAPHIC_TAGS):
+                return True
+    return False
+
+def count_captioned_images(input_path):
+    # Cheap pre-pass (no save) so each file's starting SQ is known up front:
+    # only word/document.xml is parsed, with lxml, and no python-docx objects
+    # are built. The labelling pass does the one full python-docx load.
+    with zipfile.ZipFile(input_path) as zf:
+        try:
+            xml_content = zf.read('word/document.xml')
+        except KeyError:
+            xml_content = None
+    if xml_content is None:
+        body = Document(input_path).element.body  # Unusual layout
+    else:
+        body = etree.fromstring(xml_content).find(qn('w:body'))
+    return sum(1 for _ in iter_captioned_images(body.iterchildren(_W_P)))
+
+def export_image(doc, p, icn, image_dir):
+    # Write the paragraph's (first) image straight from the already-loaded
+    # package, so there is no second unzip/parse pass to extract it later.
+    for rId in _BLIP_EMBEDS(p):
+        image_part = doc.part.related_parts.get(rId)
+        if image_part is not None:
+            with open(os.path.join(image_dir, f"{icn}.{image_part.partname.ext}"), "wb") as f:
+                f.write(image_part.blob)
+            return True
+    return False
 
-def update_doc_with_icn_labels(input_path, params, start_sq, pad_len, log_queue):
+def update_doc_with_icn_labels(input_path, output_path, params, start_sq, pad_len, log_queue, image_dir=None):
     dmc_code = params['dmc_code']
     log_queue.put(f"  • Using DMC: {dmc_code}")
+    if not has_graphics(input_path):
+        # Nothing to label: skip the python-docx load and copy the file as-is
+        shutil.copyfile(input_path, output_path)
+        log_queue.put(f"  • No images found. Next SQ will be {start_sq}.")
+        return start_sq
     doc = Document(input_path)
     sq = start_sq  # Use the starting sequence number passed into the function
-    paragraphs, i, generated_icns = doc.paragraphs[:], 0, []
+    # Snapshot the body's <w:p> elements once; ICN paragraphs are inserted as
+    # siblings with addnext(), so the elements not yet visited stay valid.
+    p_elems, generated_icns, exported = list(doc.element.body.iterchildren(_W_P)), [], 0
+    if image_dir:
+        os.makedirs(image_dir, exist_ok=True)
 
-    while i < len(paragraphs):
-        para = paragraphs[i]
-        has_image = any('graphic' in run._element.xml for run in para.runs)
-        if has_image:
-            caption_found = False
-            if "figure" in para.text.lower():
-                caption_found = True
-            else:
-                for j in range(1, 4):
-                    if (i + j) < len(paragraphs):
-                        caption_text = paragraphs[i + j].text.strip()
-                        if caption_text:
-                            if caption_text.lower().startswith("figure"):
-                                caption_found = True
-                            break
-            if caption_found:
-                icn = generate_icn_code(
-                    dmc_code, params['kpc'], params['xyz'],
-                    str(sq).zfill(pad_len), params['icv'], params['issue'], params['sec']
-                )
-                sq += 1  # Increment sequence number for each image
-                if icn:
-                    para._p.addnext(doc.add_paragraph(icn)._p)
-                    generated_icns.append(icn)
-                    paragraphs = doc.paragraphs[:]
-                    i += 1
-        i += 1
+    for p in iter_captioned_images(p_elems):
+        icn = generate_icn_code(
+            dmc_code, params['kpc'], params['xyz'],
+            str(sq).zfill(pad_len), params['icv'], params['issue'], params['sec']
+        )
+        sq += 1  # Increment sequence number for each image
+        if icn:
+            p.addnext(doc.add_paragraph(icn)._p)
+            generated_icns.append(icn)
+            if image_dir and export_image(doc, p, icn, image_dir):
+                exported += 1
     
     log_queue.put(f"  • Found {len(generated_icns)} captioned images. Next SQ will be {sq}.")
+    if image_dir:
+        log_queue.put(f"  • Exported {exported} images named by ICN.")
     
-    temp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".docx")
-    doc.save(temp_output.name)
-    # Return the temp file path AND the next sequence number to use
-    return temp_output.name, sq
+    # Serialize in memory and write the output file in one go: no temp file is
+    # created on disk (or on a small $TMPDIR tmpfs) and no rename is needed.
+    buf = io.BytesIO()
+    doc.save(buf)
+    with open(output_path, "wb") as f:
+        f.write(buf.getbuffer())
+    # Return the next sequence number to use
+    return sq
 
 # ==============================================================================
 # 2. TKINTER BATCH PROCESSING GUI
@@ -80,6 +187,7 @@ class App:
 
         self.input_folder = tk.StringVar()
         self.output_folder = tk.StringVar()
+        self.export_images = tk.BooleanVar(value=False)
         self.security_options = {
             "01-Unclassified": "01", "02-UK official Sensitive": "02",
             "03-RESTRICTED": "03", "02-INTERNAL": "02", "05-Confidential": "04"
@@ -121,6 +229,7 @@ class App:
                 self.entries[label] = ttk.Entry(params_frame)
                 self.entries[label].insert(0, value)
             self.entries[label].grid(row=i, column=1, sticky="ew", padx=5, pady=5)
+        ttk.Checkbutton(params_frame, text="Also export images named by ICN", variable=self.export_images).grid(row=len(fields), column=0, columnspan=2, sticky="w", padx=5, pady=5)
         params_frame.grid_columnconfigure(1, weight=1)
 
         # Action Button
@@ -135,7 +244,31 @@ class App:
         self.log_widget.config(state="disabled")
 
         self.log_queue = queue.Queue()
-        self.root.after(100, self.process_queue)
+        # Workers push a virtual event after queueing, so the log is drained as
+        # soon as there is something to show and the UI stays idle otherwise.
+        # Tkinter only hands a worker's Tcl call over to the main loop when Tcl
+        # is built with threads; without them the heartbeat polls instead.
+        self.push_log = bool(int(root.tk.call("info", "exists", "tcl_platform(threaded)")))
+        self.root.bind("<<LogUpdated>>", self.process_queue)
+        self.root.after(self.heartbeat_ms(), self.heartbeat)
+
+    def log(self, msg):
+        # Called from the worker thread
+        self.log_queue.put(msg)
+        if self.push_log:
+            try:
+                self.root.event_generate("<<LogUpdated>>", when="tail")
+            except (RuntimeError, tk.TclError):
+                pass  # Main loop has exited: nobody is left to show the log
+
+    def heartbeat_ms(self):
+        return 1000 if self.push_log else 100
+
+    def heartbeat(self):
+        # Fallback for an event generated before the binding existed, and the
+        # only drain when Tcl has no thread support
+        self.process_queue()
+        self.root.after(self.heartbeat_ms(), self.heartbeat)
 
     def select_folder(self, string_var, title):
         path = filedialog.askdirectory(title=title)
@@ -157,7 +290,8 @@ class App:
         params = {
             'kpc': self.entries["RPC (KPC)"].get(), 'xyz': self.entries["XYZ (Origcage)"].get(),
             'sq_start': self.entries["Sequence Start"].get(), 'icv': self.entries["Variant (ICV)"].get(),
-            'issue': self.entries["Issue"].get(), 'sec': self.security_options[self.entries["Security"].get()]
+            'issue': self.entries["Issue"].get(), 'sec': self.security_options[self.entries["Security"].get()],
+            'export_images': self.export_images.get()
         }
         
         thread = threading.Thread(target=self.run_batch_thread, args=(input_dir, output_dir, params), daemon=True)
@@ -168,12 +302,12 @@ class App:
             timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
             final_output_folder = os.path.join(output_dir, f"output_{timestamp}")
             os.makedirs(final_output_folder, exist_ok=True)
-            self.log_queue.put(f"✅ Created output folder: {final_output_folder}\n")
+            self.log(f"✅ Created output folder: {final_output_folder}\n")
 
             docx_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.docx') and not f.startswith('~')]
             if not docx_files:
-                self.log_queue.put("⚠️ No .docx files found in the selected input folder.")
-                self.log_queue.put("DONE")
+                self.log("⚠️ No .docx files found in the selected input folder.")
+                self.log("DONE")
                 return
             
             # --- CONTINUOUS SEQUENCE LOGIC ---
@@ -181,44 +315,72 @@ class App:
             current_sq = int(params['sq_start'])
             pad_len = len(params['sq_start'])
             
-            for filename in docx_files:
-                self.log_queue.put(f"📂 Processing: {filename}")
-                input_path = os.path.join(input_dir, filename)
-                
-                current_params = params.copy()
-                current_params['dmc_code'] = os.path.splitext(filename)[0]
-
-                # Pass the current sequence number and get the next one back
-                temp_path, next_sq = update_doc_with_icn_labels(input_path, current_params, current_sq, pad_len, self.log_queue)
-                
-                # Update the sequence number for the next file
-                current_sq = next_sq
-                
-                final_path = os.path.join(final_output_folder, filename)
-                shutil.copy(temp_path, final_path)
-                os.remove(temp_path)
-                self.log_queue.put(f"  -> Saved to output folder.\n")
+            max_workers = os.cpu_count() or 1
+
+            # Pass 1: count captioned images per file in parallel, then prefix-sum
+            # the counts so every file knows its starting sequence number. A file
+            # that can't be read counts as 0; its error is reported in pass 2.
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                count_futures = [executor.submit(count_captioned_images, os.path.join(input_dir, f)) for f in docx_files]
+                counts = [0 if future.exception() else future.result() for future in count_futures]
+            start_sqs = accumulate(counts[:-1], initial=current_sq)
+
+            # Pass 2: label and save every file in parallel with its assigned SQ
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self.process_file, input_dir, final_output_folder, filename, params, start_sq, pad_len)
+                    for filename, start_sq in zip(docx_files, start_sqs)
+                ]
+                # Report in file order; one failing file doesn't hide the others
+                for filename, future in zip(docx_files, futures):
+                    try:
+                        msgs = future.result()
+                    except Exception as e:
+                        msgs = [f"📂 Processing: {filename}", f"  ❌ Failed: {e}\n"]
+                    for msg in msgs:
+                        self.log(msg)
             
-            self.log_queue.put("🎉 Batch processing complete!")
+            self.log("🎉 Batch processing complete!")
         except Exception as e:
-            self.log_queue.put(f"\n❌ AN UNEXPECTED ERROR OCCURRED: {e}")
+            self.log(f"\n❌ AN UNEXPECTED ERROR OCCURRED: {e}")
         finally:
-            self.log_queue.put("DONE")
+            self.log("DONE")
+
+    def process_file(self, input_dir, output_folder, filename, params, start_sq, pad_len):
+        # Buffer this file's log lines so parallel files don't interleave
+        file_log = queue.Queue()
+        file_log.put(f"📂 Processing: {filename}")
+        
+        current_params = params.copy()
+        current_params['dmc_code'] = os.path.splitext(filename)[0]
+        image_dir = os.path.join(output_folder, "images", current_params['dmc_code']) if params.get('export_images') else None
+        
+        update_doc_with_icn_labels(
+            os.path.join(input_dir, filename), os.path.join(output_folder, filename),
+            current_params, start_sq, pad_len, file_log, image_dir
+        )
+        file_log.put(f"  -> Saved to output folder.\n")
+        return list(file_log.queue)
 
-    def process_queue(self):
+    def process_queue(self, event=None):
+        # Drain everything queued since the last tick and render it in one insert
+        msgs, done = [], False
         try:
             while True:
                 msg = self.log_queue.get_nowait()
                 if msg == "DONE":
-                    self.run_btn.config(state="normal")
-                    return
-                self.log_widget.config(state="normal")
-                self.log_widget.insert(tk.END, msg + "\n")
-                self.log_widget.see(tk.END)
-                self.log_widget.config(state="disabled")
+                    done = True
+                    break
+                msgs.append(msg)
         except queue.Empty:
             pass
-        self.root.after(100, self.process_queue)
+        if msgs:
+            self.log_widget.config(state="normal")
+            self.log_widget.insert(tk.END, "\n".join(msgs) + "\n")
+            self.log_widget.see(tk.END)
+            self.log_widget.config(state="disabled")
+        if done:
+            self.run_btn.config(state="normal")
 
 if __name__ == "__main__":
     root = tk.Tk()
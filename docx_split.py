@@ -0,0 +1,323 @@
+# Splits a DOCX into one file per heading by working on the zip package
+# directly. Shared by the test2.py and test3.py splitter GUIs.
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from copy import deepcopy
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.styles import BabelFish
+from lxml import etree
+
+
+NSMAP = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+# Already-compressed media; deflating these again costs CPU for no gain
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+# Parts read into memory up front; everything else (media, embeddings) is
+# streamed from the source zip when a section is written
+_XML_EXTENSIONS = (".xml", ".rels")
+_COPY_CHUNK = 1 << 16
+# Anything but letters, digits, space, underscore and hyphen (same set as
+# str.isalnum() plus " _-") is dropped from output file names
+_UNSAFE_CHARS = re.compile(r"[^\w \-]")
+
+# Compiled once; these run for every top-level paragraph / copied block
+_XP_PSTYLE = etree.XPath("string(w:pPr/w:pStyle/@w:val)", namespaces=NSMAP)
+_XP_REL_ATTRS = etree.XPath(".//@r:*", namespaces=NSMAP)
+_XP_TEXT = etree.XPath("w:r/w:t/text() | w:hyperlink/w:r/w:t/text()", namespaces=NSMAP)
+
+# Parts are parsed straight from the zip; no ID index is needed since nothing
+# is ever looked up by xml:id
+_PARSER = etree.XMLParser(collect_ids=False, huge_tree=True, resolve_entities=False)
+
+
+def iter_block_items(parent_elm):
+    # lxml filters by tag in C, so w:sectPr, bookmarks etc. never reach Python
+    return parent_elm.iterchildren(qn("w:p"), qn("w:tbl"))
+
+
+def rel_target(partname, rel):
+    # Zip name of the part an internal relationship points at
+    return posixpath.normpath(posixpath.join(posixpath.dirname(partname), rel.get("Target"))).lstrip("/")
+
+
+def related_part(parts, partname, reltype):
+    rels_part = parts.get(rels_name(partname))
+    if rels_part is None:
+        return None
+    for rel in etree.fromstring(rels_part).iterchildren(f"{{{RELS_NS}}}Relationship"):
+        if rel.get("Type") == reltype and rel.get("TargetMode") != "External":
+            return rel_target(partname, rel)
+    return None
+
+
+def entry_digest(src, name):
+    # blake2b of a zip entry, read in chunks so the image is never held whole
+    digest = hashlib.blake2b(digest_size=16)
+    with src.open(name) as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def dedupe_images(src, parts, document_part):
+    # Map the rId of every image whose bytes were already seen to the first
+    # rId with those bytes, so a repeated image is stored once per section.
+    # Each entry is hashed once, however many rIds point at it.
+    by_digest = {}
+    entry_digests = {}
+    shared_images = {}
+    rels = etree.fromstring(parts[rels_name(document_part)])
+    for rel in rels.iterchildren(f"{{{RELS_NS}}}Relationship"):
+        if rel.get("TargetMode") == "External" or rel.get("Type") != RT.IMAGE:
+            continue
+        target = rel_target(document_part, rel)
+        if target not in parts:
+            continue
+        rId = rel.get("Id")
+        if target not in entry_digests:
+            entry_digests[target] = entry_digest(src, target)
+        first_rId = by_digest.setdefault(entry_digests[target], rId)
+        if first_rId != rId:
+            shared_images[rId] = first_rId
+    return shared_images
+
+
+def rels_name(partname):
+    # "word/document.xml" -> "word/_rels/document.xml.rels"; "" is the package
+    head, tail = posixpath.split(partname)
+    return posixpath.join(head, "_rels", tail + ".rels")
+
+
+def rel_targets(partname, rels):
+    # Zip names of the internal parts a .rels file points at
+    return [
+        rel_target(partname, rel)
+        for rel in rels.iterchildren(f"{{{RELS_NS}}}Relationship")
+        if rel.get("TargetMode") != "External"
+    ]
+
+
+def section_template(doc_xml):
+    # Built once per split and deep-copied for every section: the source's
+    # root element and namespace declarations, anything before the body, and
+    # a body holding only the page setup (w:sectPr)
+    template = etree.Element(doc_xml.tag, attrib=dict(doc_xml.attrib), nsmap=doc_xml.nsmap)
+    for child in doc_xml.iterchildren():
+        if child.tag != qn("w:body"):
+            template.append(deepcopy(child))
+    body = etree.SubElement(template, qn("w:body"))
+    sectPr = doc_xml.find(qn("w:body")).find(qn("w:sectPr"))
+    if sectPr is not None:
+        body.append(deepcopy(sectPr))
+    return template
+
+
+def section_document(template, elements, shared_images):
+    # A copy of the template with this section's blocks inserted ahead of
+    # the page setup
+    document = deepcopy(template)
+    body = document.find(qn("w:body"))
+    body[:0] = [deepcopy(element) for element in elements]
+    for attr in _XP_REL_ATTRS(body):
+        if attr in shared_images:
+            attr.getparent().set(attr.attrname, shared_images[attr])
+    return document
+
+
+def copy_entry(src, out, name, compress_type):
+    # Stream one entry from the source package into a section, with the same
+    # entry attributes writestr would give it
+    info = src.getinfo(name)
+    zinfo = zipfile.ZipInfo(name, time.localtime(time.time())[:6])
+    zinfo.compress_type = compress_type
+    zinfo._compresslevel = out.compresslevel
+    zinfo.external_attr = 0o600 << 16
+    with src.open(info) as fin, out.open(zinfo, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as fout:
+        shutil.copyfileobj(fin, fout, _COPY_CHUNK)
+
+
+def make_section_writer(src, static_parts, document_part, body):
+    # Every part except the main document is copied byte for byte into each
+    # section, so styles, numbering, headers and images keep their original
+    # relationship ids. Only relationships the section no longer uses are
+    # dropped, together with the parts that become unreachable. Parts that
+    # weren't read up front (data is None) are streamed from src.
+    document_rels = rels_name(document_part)
+    rels = etree.fromstring(static_parts[document_rels])
+    content_types = etree.fromstring(static_parts["[Content_Types].xml"])
+    rels_sources = {}
+    static_targets = {}
+    for name, data in static_parts.items():
+        if name.endswith(".rels") and name != document_rels:
+            head, tail = posixpath.split(name)
+            source = posixpath.join(posixpath.dirname(head), tail[:-len(".rels")])
+            rels_sources[name] = source
+            static_targets[source] = rel_targets(source, etree.fromstring(data))
+    body_rIds = set(_XP_REL_ATTRS(body))
+
+    def write_section(out_path, document):
+        used_rIds = set(_XP_REL_ATTRS(document))
+        section_rels = deepcopy(rels)
+        for rel in list(section_rels):
+            if rel.get("Id") in body_rIds and rel.get("Id") not in used_rIds:
+                section_rels.remove(rel)
+
+        targets = dict(static_targets)
+        targets[document_part] = rel_targets(document_part, section_rels)
+        keep, stack = set(), [""]
+        while stack:
+            for target in targets.get(stack.pop(), ()):
+                if target not in keep:
+                    keep.add(target)
+                    stack.append(target)
+
+        section_types = deepcopy(content_types)
+        for override in list(section_types.iterchildren(f"{{{CT_NS}}}Override")):
+            if override.get("PartName").lstrip("/") not in keep:
+                section_types.remove(override)
+
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as out:
+            out.writestr("[Content_Types].xml", etree.tostring(section_types, xml_declaration=True, encoding="UTF-8", standalone=True))
+            out.writestr(document_part, etree.tostring(document, xml_declaration=True, encoding="UTF-8", standalone=True))
+            out.writestr(document_rels, etree.tostring(section_rels, xml_declaration=True, encoding="UTF-8", standalone=True))
+            for name, data in static_parts.items():
+                if name in keep or rels_sources.get(name) in keep or rels_sources.get(name) == "":
+                    if name.lower().endswith(STORED_EXTENSIONS):
+                        compress_type = zipfile.ZIP_STORED
+                    else:
+                        compress_type = zipfile.ZIP_DEFLATED
+                    if data is None:
+                        copy_entry(src, out, name, compress_type)
+                    else:
+                        out.writestr(name, data, compress_type=compress_type)
+
+    return write_section
+
+
+def heading_style_ids(styles_xml, heading_style):
+    # styleIds of the paragraph styles called heading_style. Names go through
+    # BabelFish the way python-docx's style.name does, so both "heading 1" and
+    # "Heading 1" in styles.xml match.
+    style_ids = set()
+    for style in styles_xml.iterchildren(qn("w:style")):
+        name_elm = style.find(qn("w:name"))
+        if style.get(qn("w:type")) != "paragraph" or name_elm is None:
+            continue
+        if BabelFish.internal2ui(name_elm.get(qn("w:val"))) == heading_style:
+            style_ids.add(style.get(qn("w:styleId")))
+    return frozenset(style_ids)
+
+
+def is_heading(p, style_ids):
+    return _XP_PSTYLE(p) in style_ids
+
+
+def count_sections(body, style_ids):
+    # Cheap pre-pass so the progress bar has a total while sections stream out:
+    # one section per heading, plus one for any content before the first.
+    # Only top-level paragraphs can start a section, so lxml filters the
+    # body's children by tag instead of every block being looked at in Python
+    count = sum(1 for p in body.iterchildren(qn("w:p")) if is_heading(p, style_ids))
+    first = next(iter_block_items(body), None)
+    if first is not None and not (first.tag == qn("w:p") and is_heading(first, style_ids)):
+        count += 1
+    return count
+
+
+def stream_sections(body, style_ids):
+    # Group top-level blocks into (title, blocks) in a single pass, so only the
+    # current section is held in memory. title is None for content before the
+    # first heading.
+    title, blocks = None, []
+    for block in iter_block_items(body):
+        if block.tag == qn("w:p") and is_heading(block, style_ids):
+            if blocks:
+                yield title, blocks
+            title, blocks = "".join(_XP_TEXT(block)).strip(), [block]
+        else:
+            blocks.append(block)
+    if blocks:
+        yield title, blocks
+
+
+def split_docx_by_heading_with_images(docx_path, output_dir, heading_style="Heading 1", progress_callback=None):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    # Parse the main document part directly, without building python-docx's
+    # object model on top of it. Only the XML and relationship parts are read
+    # up front; media is streamed from the source zip into each section, so
+    # the package stays open until every section has been written. The None
+    # placeholders keep the source's entry order.
+    with zipfile.ZipFile(docx_path) as src:
+        parts = {
+            name: src.read(name) if name.lower().endswith(_XML_EXTENSIONS) else None
+            for name in src.namelist()
+        }
+        document_part = related_part(parts, "", RT.OFFICE_DOCUMENT)
+        if document_part is None or document_part not in parts:
+            raise ValueError(f"{docx_path} is not a Word document")
+        doc_xml = etree.fromstring(parts.pop(document_part) or src.read(document_part), _PARSER)
+        body = doc_xml.find(qn("w:body"))
+        template = section_template(doc_xml)
+
+        styles_part = related_part(parts, document_part, RT.STYLES)
+        if styles_part is not None:
+            style_ids = heading_style_ids(etree.fromstring(parts.get(styles_part) or src.read(styles_part), _PARSER), heading_style)
+        else:
+            style_ids = frozenset()
+        shared_images = dedupe_images(src, parts, document_part)
+        write_section = make_section_writer(src, parts, document_part, body)
+        total = count_sections(body, style_ids)
+        workers = os.cpu_count() or 1
+        completed = 0
+
+        def collect(futures):
+            nonlocal completed
+            for future in futures:
+                future.result()
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed, total)
+
+        # Each section is built and handed to the pool straight away, so only the
+        # documents still waiting to be saved are held in memory. Sections are
+        # independent, and zlib and lxml serialisation release the GIL for most
+        # of the save.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for i, (title, section_blocks) in enumerate(stream_sections(body, style_ids)):
+                # Determine the title for the file
+                if title is None:
+                    title = "Introduction" # Default title for content before the first heading
+                if not title:
+                    title = f"Section_{i+1}" # Fallback for empty titles
+
+                document = section_document(template, section_blocks, shared_images)
+
+                safe_title = _UNSAFE_CHARS.sub("", title).rstrip()[:50]
+                out_path = os.path.join(output_dir, f"{i+1:02d}_{safe_title}.docx")
+                pending.add(executor.submit(write_section, out_path, document))
+                del document
+
+                # Don't let built documents pile up faster than they are saved
+                if len(pending) > workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+            collect(as_completed(pending))
+
+    return completed
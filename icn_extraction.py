@@ -1,7 +1,8 @@
 import os
+import shutil
 import zipfile
 import re
-import xml.etree.ElementTree as ET
+from lxml import etree
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 import threading
@@ -13,6 +14,29 @@ import sys
 #    No changes are needed here.
 # ==============================================================================
 
+W_P = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p'
+W_T = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'
+# Characters not allowed in Windows file names, replaced in one C-level pass
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+_ICN_RE = re.compile(r'ICN-\s*([\w\-.]+)')
+
+def iter_paragraph_text(stream):
+    """Yields the joined <w:t> text of each paragraph, discarding parsed elements as it goes."""
+    for _, elem in etree.iterparse(stream, tag=W_P):
+        # An ICN split across runs is joined back up, but a label never runs
+        # on into the next paragraph; attributes and w:delText are not text
+        yield "".join(t.text for t in elem.iter(W_T) if t.text)
+        # Standard low-memory iterparse idiom: drop what has already been seen
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+def scan_icn_labels(texts):
+    """Yields the ICN labels found in each text."""
+    for text in texts:
+        for match in _ICN_RE.finditer(text):
+            yield f"ICN-{match.group(1)}"
+
 def extract_images_with_tagged_icn(docx_path, output_dir):
     with zipfile.ZipFile(docx_path, 'r') as docx:
         media_files = sorted([f for f in docx.namelist() if f.startswith('word/media/')])
@@ -20,24 +44,18 @@ def extract_images_with_tagged_icn(docx_path, output_dir):
             print(f"⏭️ Skipping {os.path.basename(docx_path)}: No images found.")
             return False
         try:
-            xml_content = docx.read("word/document.xml")
+            xml_stream = docx.open("word/document.xml")
         except KeyError:
             print(f"❌ {os.path.basename(docx_path)} is missing document.xml.")
             return False
 
-        plain_text = ""
         try:
-            root = ET.fromstring(xml_content)
-            ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-            for t in root.findall('.//w:t', ns):
-                if t.text:
-                    plain_text += t.text
-        except ET.ParseError:
+            with xml_stream:
+                icn_labels = list(scan_icn_labels(iter_paragraph_text(xml_stream)))
+        except etree.XMLSyntaxError:
             print(f"⚠️ Warning for {os.path.basename(docx_path)}: Could not parse XML, falling back to simple text search.")
-            plain_text = xml_content.decode('utf-8', errors='ignore')
-
-        icn_matches = re.findall(r'ICN-\s*([\w\-.]+)', plain_text)
-        icn_labels = [f"ICN-{match}" for match in icn_matches]
+            plain_text = docx.read("word/document.xml").decode('utf-8', errors='ignore')
+            icn_labels = list(scan_icn_labels([plain_text]))
 
         if len(icn_labels) != len(media_files):
             print(f"⚠️ Warning for {os.path.basename(docx_path)}: Found {len(media_files)} images but {len(icn_labels)} ICN tags. Using default names to avoid errors.")
@@ -53,12 +71,12 @@ def extract_images_with_tagged_icn(docx_path, output_dir):
                 label = f"image_{i + 1}"
             
             ext = os.path.splitext(media_file)[1]
-            safe_label = re.sub(r'[<>:"/\\|?*]', '_', label)
+            safe_label = label.translate(_SANITIZE_TABLE)
             out_path = os.path.join(output_dir, f"{safe_label}{ext}")
             
-            image_data = docx.read(media_file)
-            with open(out_path, "wb") as out_file:
-                out_file.write(image_data)
+            # Stream the entry to disk in fixed chunks instead of reading it whole
+            with docx.open(media_file) as src, open(out_path, "wb") as out_file:
+                shutil.copyfileobj(src, out_file, length=1 << 16)
             
             print(f"✅ Saved: {os.path.basename(out_path)}")
         
@@ -131,7 +149,13 @@ class App:
         self.log_widget.pack(fill=tk.BOTH, expand=True)
         
         self.log_queue = queue.Queue()
-        self.root.after(100, self.process_log_queue)
+        # Workers push a virtual event after queueing, so the log is drained as
+        # soon as there is something to show and the UI stays idle otherwise.
+        # Tkinter only hands a worker's Tcl call over to the main loop when Tcl
+        # is built with threads; without them the heartbeat polls instead.
+        self.push_log = bool(int(root.tk.call("info", "exists", "tcl_platform(threaded)")))
+        self.root.bind("<<LogUpdated>>", self.process_log_queue)
+        self.root.after(self.heartbeat_ms(), self.heartbeat)
 
     def browse_input(self):
         path = filedialog.askdirectory(title="Select Folder with DOCX Files")
@@ -179,42 +203,75 @@ class App:
         final_output_root = os.path.join(parent_output_folder, input_folder_name)
         
         # Redirect print statements to our log queue
-        sys.stdout = QueueWriter(self.log_queue)
+        sys.stdout = QueueWriter(self.log_queue, self.notify_log)
         
         try:
             batch_process_folder(input_folder, final_output_root)
         except Exception as e:
             print(f"\n❌ AN UNEXPECTED ERROR OCCURRED:\n{e}")
         finally:
-            # When done, restore stdout and send a "DONE" signal
+            # When done, flush any partial line, restore stdout and send a "DONE" signal
+            sys.stdout.flush()
             sys.stdout = sys.__stdout__
             self.log_queue.put("DONE")
+            self.notify_log()
+
+    def notify_log(self):
+        """Wakes the UI thread to drain the log queue (called from the worker)."""
+        if self.push_log:
+            try:
+                self.root.event_generate("<<LogUpdated>>", when="tail")
+            except (RuntimeError, tk.TclError):
+                pass  # Main loop has exited: nobody is left to show the log
+
+    def heartbeat_ms(self):
+        return 1000 if self.push_log else 100
+
+    def heartbeat(self):
+        """Fallback for an event generated before the binding existed, and the
+        only drain when Tcl has no thread support."""
+        self.process_log_queue()
+        self.root.after(self.heartbeat_ms(), self.heartbeat)
 
-    def process_log_queue(self):
+    def process_log_queue(self, event=None):
         """Checks the queue for new log messages and updates the widget."""
+        lines, done = [], False
         try:
             while True:
                 line = self.log_queue.get_nowait()
                 if line == "DONE":
-                    self.set_ui_state("normal")
-                    return
-                else:
-                    self.log_widget.config(state="normal")
-                    self.log_widget.insert(tk.END, line)
-                    self.log_widget.see(tk.END) # Auto-scroll
-                    self.log_widget.config(state="disabled")
+                    done = True
+                    break
+                lines.append(line)
         except queue.Empty:
             pass
-        self.root.after(100, self.process_log_queue)
+        if lines:
+            # One insert per tick instead of one per message
+            self.log_widget.config(state="normal")
+            self.log_widget.insert(tk.END, "".join(lines))
+            self.log_widget.see(tk.END) # Auto-scroll
+            self.log_widget.config(state="disabled")
+        if done:
+            self.set_ui_state("normal")
 
 # Helper class to redirect stdout to the queue
 class QueueWriter:
-    def __init__(self, q):
+    def __init__(self, q, notify):
         self.queue = q
+        self.notify = notify
+        self._buf = ""
     def write(self, text):
-        self.queue.put(text)
+        # Buffer partial writes and only enqueue complete lines
+        self._buf += text
+        if "\n" in self._buf:
+            complete, _, self._buf = self._buf.rpartition("\n")
+            self.queue.put(complete + "\n")
+            self.notify()
     def flush(self):
-        pass
+        if self._buf:
+            self.queue.put(self._buf)
+            self._buf = ""
+            self.notify()
 
 # ==============================================================================
 # 3. MAIN EXECUTION BLOCK
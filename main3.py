@@ -1,12 +1,17 @@
 import os
 import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
 from pdf2docx import Converter
 import fitz  # PyMuPDF
 from docx import Document  # python-docx
-import re
+
+
+# NULLs and invalid control characters (keeps \t, \n and \r), removed via str.translate
+_CTRL_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20)])
 
 
 def convert_pdf_to_docx(pdf_path, docx_path):
@@ -27,10 +32,6 @@ def extract_text_to_docx(pdf_path, docx_path):
         doc = fitz.open(pdf_path)
         word_doc = Document()
 
-        def clean_text(s: str) -> str:
-            # Remove NULLs and invalid control characters
-            return re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', s)
-
         for page_num, page in enumerate(doc, start=1):
             word_doc.add_heading(f"Page {page_num}", level=2)
 
@@ -44,7 +45,7 @@ def extract_text_to_docx(pdf_path, docx_path):
             blocks = sorted(blocks, key=lambda b: (b[1], b[0]))
 
             for b in blocks:
-                text = clean_text(b[4].strip())
+                text = b[4].strip().translate(_CTRL_TABLE)
                 if text:
                     word_doc.add_paragraph(text)
 
@@ -55,17 +56,17 @@ def extract_text_to_docx(pdf_path, docx_path):
         return False
 
 
-def run_conversion_thread(pdf_file, docx_file):
-    progress_bar.start()
-    convert_button.config(state=tk.DISABLED)
-
+def convert_file(pdf_file, fast_mode=False):
+    """Convert one PDF next to itself; runs inside a worker process for batches."""
+    docx_file = os.path.splitext(pdf_file)[0] + ".docx"
     success = False
 
     try:
-        # Step 1: Try pdf2docx (full fidelity conversion)
-        success = convert_pdf_to_docx(pdf_file, docx_file)
+        # Step 1: Try pdf2docx (full fidelity conversion), unless fast mode skips it
+        if not fast_mode:
+            success = convert_pdf_to_docx(pdf_file, docx_file)
 
-        # Step 2: If that fails, fallback to text extraction
+        # Step 2: If that fails (or in fast mode), use PyMuPDF text extraction
         if not success:
             success = extract_text_to_docx(pdf_file, docx_file)
 
@@ -73,45 +74,114 @@ def run_conversion_thread(pdf_file, docx_file):
         print(f"Processing error: {e}")
         success = False
 
-    progress_bar.stop()
-    convert_button.config(state=tk.NORMAL)
+    return docx_file, success and os.path.isfile(docx_file)
+
+
+def convert_batch(pdf_files, fast_mode=False):
+    """Convert several PDFs in a process pool; returns the list of failed PDFs."""
+    pool_size = min(os.cpu_count() or 1, len(pdf_files))
+    max_pending = 2 * pool_size  # Bound in-flight work instead of queuing every file at once
+    failed, pending = [], {}
+    files = iter(pdf_files)
+
+    # Separate processes keep pdf2docx's Converter state isolated per file
+    with ProcessPoolExecutor(max_workers=pool_size) as executor:
+        while True:
+            for pdf_file in files:
+                try:
+                    future = executor.submit(convert_file, pdf_file, fast_mode)
+                except BrokenProcessPool as e:
+                    # A worker died; the pool can't take any more files
+                    print(f"Processing error: {e}")
+                    failed.append(pdf_file)
+                    failed.extend(files)
+                    break
+                pending[future] = pdf_file
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_file = pending.pop(future)
+                try:
+                    _, success = future.result()
+                except Exception as e:
+                    print(f"Processing error: {e}")
+                    success = False
+                if not success:
+                    failed.append(pdf_file)
+
+    return failed
+
+
+def run_conversion_thread(pdf_files, fast_mode):
+    progress_bar.start()
+    convert_button.config(state=tk.DISABLED)
 
-    if success and os.path.isfile(docx_file):
-        messagebox.showinfo("Success", f"PDF successfully converted to:\n{docx_file}")
-    else:
+    try:
+        if len(pdf_files) == 1:
+            docx_file, success = convert_file(pdf_files[0], fast_mode)
+            failed = [] if success else pdf_files
+        else:
+            failed = convert_batch(pdf_files, fast_mode)
+    except Exception as e:
+        print(f"Processing error: {e}")
+        failed = pdf_files
+    finally:
+        progress_bar.stop()
+        convert_button.config(state=tk.NORMAL)
+
+    if not failed:
+        if len(pdf_files) == 1:
+            messagebox.showinfo("Success", f"PDF successfully converted to:\n{docx_file}")
+        else:
+            messagebox.showinfo("Success", f"{len(pdf_files)} PDFs successfully converted.")
+    elif len(pdf_files) == 1:
         messagebox.showerror("Error", "Conversion failed. See console for details.")
+    else:
+        names = "\n".join(os.path.basename(f) for f in failed)
+        messagebox.showerror("Error", f"{len(failed)} of {len(pdf_files)} conversions failed. See console for details.\n{names}")
 
 
 def browse_and_convert():
-    pdf_file = filedialog.askopenfilename(
-        title="Select PDF File",
+    pdf_files = filedialog.askopenfilenames(
+        title="Select PDF File(s)",
         filetypes=[("PDF Files", "*.pdf")]
     )
 
-    if not pdf_file:
+    if not pdf_files:
         return
 
-    docx_file = os.path.splitext(pdf_file)[0] + ".docx"
+    existing = [os.path.splitext(f)[0] + ".docx" for f in pdf_files]
+    existing = [f for f in existing if os.path.exists(f)]
 
-    if os.path.exists(docx_file):
-        if not messagebox.askyesno("Overwrite?", f"{docx_file} already exists.\nDo you want to overwrite it?"):
+    if len(existing) == 1:
+        if not messagebox.askyesno("Overwrite?", f"{existing[0]} already exists.\nDo you want to overwrite it?"):
             return
+    elif existing:
+        if not messagebox.askyesno("Overwrite?", f"{len(existing)} DOCX files already exist.\nDo you want to overwrite them?"):
+            return
+
+    threading.Thread(target=run_conversion_thread, args=(list(pdf_files), fast_mode.get()), daemon=True).start()
 
-    threading.Thread(target=run_conversion_thread, args=(pdf_file, docx_file), daemon=True).start()
 
+# GUI setup (guarded so worker processes can import this module)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("PDF to DOCX Converter")
+    root.geometry("300x210")
 
-# GUI setup
-root = tk.Tk()
-root.title("PDF to DOCX Converter")
-root.geometry("300x180")
+    label = tk.Label(root, text="Click the button to convert PDF to DOCX")
+    label.pack(pady=10)
 
-label = tk.Label(root, text="Click the button to convert PDF to DOCX")
-label.pack(pady=10)
+    fast_mode = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="Fast mode (text only, skip pdf2docx)", variable=fast_mode).pack()
 
-convert_button = tk.Button(root, text="Select PDF and Convert", command=browse_and_convert)
-convert_button.pack(pady=10)
+    convert_button = tk.Button(root, text="Select PDF and Convert", command=browse_and_convert)
+    convert_button.pack(pady=10)
 
-progress_bar = ttk.Progressbar(root, mode='indeterminate')
-progress_bar.pack(pady=10, fill=tk.X, padx=20)
+    progress_bar = ttk.Progressbar(root, mode='indeterminate')
+    progress_bar.pack(pady=10, fill=tk.X, padx=20)
 
-root.mainloop()
+    root.mainloop()
@@ -1,31 +1,50 @@
 import streamlit as st
-import spacy
+import numpy as np
 from pathlib import Path
 import os
-import time
-from typing import List, Dict, Any, Optional
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Tuple
 import logging
+import threading
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import traceback
 import json
+import re
 from datetime import datetime
 import io
+import hashlib
+
+if TYPE_CHECKING:
+    from spacy.tokens import Doc
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib json module is used instead
+    orjson = None
 
 # Configure environment and logging
 os.environ["STREAMLIT_WATCHER_TYPE"] = "none"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from components.ste_word_checker import STEReplacer, extract_text_from_file
-from components.llm_utills import rewrite_to_active
-from components.post_active_processor import process_active_and_polish
-from components.punctuation import detect_punctuation_violations
-from components.hyphen_suggester import detect_hyphen_suggestions
-from components.si_unit_checker import check_si_units
-from components.multiword_noun_checker import MultiwordNounChecker
+# spaCy and the components package are heavy, so they are imported where
+# they are first needed rather than on every Streamlit rerun
+
+# Non-blank lines with surrounding whitespace trimmed, found in one scan
+PARAGRAPH_RE = re.compile(r"^[^\S\n]*(\S(?:[^\n]*\S)?)", re.MULTILINE)
+WORD_RE = re.compile(r"\S+")
 
-@dataclass
+CATEGORY_ICONS = {
+    "STE Word Replacement": "🛠️",
+    "Passive Voice": "⚠️",
+    "Punctuation": "🔤",
+    "Hyphenation": "➖",
+    "SI Units": "📏",
+    "Multi-word Nouns": "🧠"
+}
+
+@dataclass(slots=True)
 class CheckResult:
     """Data class for storing check results"""
     category: str
@@ -33,6 +52,30 @@ class CheckResult:
     success_message: str
     error_message: Optional[str] = None
 
+@st.cache_resource(show_spinner="Loading language model...")
+def _get_nlp():
+    """Load the spaCy model once per process and share it across reruns"""
+    import spacy
+    # Passive-voice detection only reads tags, dependencies and sentences
+    nlp = spacy.load("en_core_web_sm", disable=["ner", "lemmatizer", "attribute_ruler"])
+    if "parser" not in nlp.pipe_names and "sentencizer" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer")
+    return nlp
+
+@st.cache_resource(show_spinner="Loading STE replacer...")
+def _get_ste():
+    """Build the STE replacer once per process and share it across reruns"""
+    from components.ste_word_checker import STEReplacer
+    from spacy.tokens import Token
+    ste = STEReplacer(json_dir="data")
+    # Make sure every token carries the STE flags, so the scan can read them
+    # directly instead of probing each token
+    if not Token.has_extension("was_replaced"):
+        Token.set_extension("was_replaced", default=False)
+    if not Token.has_extension("ste_replacement"):
+        Token.set_extension("ste_replacement", default="N/A")
+    return ste
+
 class STEDocumentProcessor:
     """Main processor class for STE document checking"""
     
@@ -42,116 +85,142 @@ class STEDocumentProcessor:
         self._initialize_components()
     
     def _initialize_components(self):
-        """Initialize spaCy and STE components with error handling"""
-        try:
-            with st.spinner("Loading language model..."):
-                self.nlp = spacy.load("en_core_web_sm")
-                if "parser" not in self.nlp.pipe_names and "sentencizer" not in self.nlp.pipe_names:
-                    self.nlp.add_pipe("sentencizer")
-            
-            with st.spinner("Loading STE replacer..."):
-                self.ste = STEReplacer(json_dir="data")
-                
-        except Exception as e:
-            st.error(f"Failed to initialize components: {str(e)}")
-            st.stop()
-    
-    def process_document(self, text: str) -> Dict[str, CheckResult]:
-        """Process document through all STE checks"""
-        paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
-        
-        # Use progress bar for better UX
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        """Initialize spaCy and STE components; errors are left to the caller"""
+        self.ste = _get_ste()
+        # Passive voice is read from the STE pipeline's own parses when it
+        # tags and parses; the separate model is only loaded when it can't
+        if not {"tagger", "parser"} <= set(self.ste.nlp.pipe_names):
+            self.nlp = _get_nlp()
+    
+    def process_document(self, text: str, on_progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, CheckResult]:
+        """Process document through all STE checks; on_progress(done, total, label) follows each check"""
+        paragraphs = PARAGRAPH_RE.findall(text)
         
+        # Each check fills one or more result categories
         checks = [
-            ("STE Word Replacement", self._check_ste_words),
-            ("Passive Voice", self._check_passive_voice),
-            ("Punctuation", self._check_punctuation),
-            ("Hyphenation", self._check_hyphenation),
-            ("SI Units", self._check_si_units),
-            ("Multi-word Nouns", self._check_multiword_nouns)
+            (("STE Word Replacement", "Passive Voice"), self._check_language),
+            (("Punctuation",), self._check_punctuation),
+            (("Hyphenation",), self._check_hyphenation),
+            (("SI Units",), self._check_si_units),
+            (("Multi-word Nouns",), self._check_multiword_nouns)
         ]
         
         results = {}
         
-        for i, (check_name, check_func) in enumerate(checks):
-            status_text.text(f"Running {check_name} check...")
-            progress_bar.progress((i + 1) / len(checks))
+        # The checks are independent, so run them side by side; on_progress is
+        # only called from this thread as each one finishes
+        with ThreadPoolExecutor(max_workers=min(len(checks), os.cpu_count() or 1)) as executor:
+            futures = {executor.submit(check_func, paragraphs): check_names
+                       for check_names, check_func in checks}
             
-            try:
-                results[check_name] = check_func(paragraphs)
-            except Exception as e:
-                logger.error(f"Error in {check_name}: {str(e)}")
-                results[check_name] = CheckResult(
-                    category=check_name,
-                    violations=[],
-                    success_message="",
-                    error_message=f"Error during {check_name} check: {str(e)}"
-                )
+            for i, future in enumerate(as_completed(futures)):
+                check_names = futures[future]
+                check_label = " and ".join(check_names)
+                if on_progress:
+                    on_progress(i + 1, len(checks), check_label)
+                
+                try:
+                    result = future.result()
+                    results.update(result if isinstance(result, dict) else {check_names[0]: result})
+                except Exception as e:
+                    logger.error(f"Error in {check_label}: {str(e)}")
+                    for check_name in check_names:
+                        results[check_name] = CheckResult(
+                            category=check_name,
+                            violations=[],
+                            success_message="",
+                            error_message=f"Error during {check_name} check: {str(e)}"
+                        )
         
-        progress_bar.empty()
-        status_text.empty()
+        # Keep the categories in their usual display order
+        results = {name: results[name] for check_names, _ in checks for name in check_names}
         
         return results
     
-    def _check_ste_words(self, paragraphs: List[str]) -> CheckResult:
-        """Check for STE word violations"""
+    def _check_language(self, paragraphs: List[str]) -> Dict[str, CheckResult]:
+        """Check STE words and passive voice from a single spaCy pass"""
+        # Imported once per document here rather than per paragraph in the scan
+        from spacy.attrs import DEP, HEAD, TAG
+        passive_attrs = [TAG, DEP, HEAD]
         flagged = []
+        passive_results = []
         
-        for line_num, line in enumerate(paragraphs, start=1):
-            try:
-                doc = self.ste.nlp(line)
-                for token in doc:
-                    if hasattr(token._, 'was_replaced') and token._.was_replaced:
-                        flagged.append({
-                            "line": line_num,
-                            "original": token.text,
-                            "pos": token.pos_,
-                            "replacement": getattr(token._, 'ste_replacement', 'N/A'),
-                            "context": line
-                        })
-            except Exception as e:
-                logger.warning(f"Error processing line {line_num}: {str(e)}")
+        # The STE pipeline already tags and parses each line when it has the
+        # components for it, so passive voice can be read from the same Doc
+        ste_docs = self.ste.nlp.pipe(paragraphs, batch_size=64)
+        if self.nlp is None:
+            doc_pairs = ((doc, doc) for doc in ste_docs)
+        else:
+            doc_pairs = zip(ste_docs, self.nlp.pipe(paragraphs, batch_size=64, n_process=1))
         
-        return CheckResult(
-            category="STE Word Replacement",
-            violations=flagged,
-            success_message="✅ No STE violations found."
-        )
-    
-    def _check_passive_voice(self, paragraphs: List[str]) -> CheckResult:
-        """Check for passive voice and provide rewrites"""
+        # Errors are reported for both categories by process_document
+        for (line_num, line), (ste_doc, doc) in zip(enumerate(paragraphs, start=1), doc_pairs):
+            flagged.extend(self._scan_ste_words(ste_doc, line_num, line))
+            passive_results.extend(self._scan_passive_voice(doc, line_num, passive_attrs))
+        
+        return {
+            "STE Word Replacement": CheckResult(
+                category="STE Word Replacement",
+                violations=flagged,
+                success_message="✅ No STE violations found."
+            ),
+            "Passive Voice": CheckResult(
+                category="Passive Voice",
+                violations=passive_results,
+                success_message="✅ No passive voice detected."
+            )
+        }
+    
+    @staticmethod
+    def _scan_ste_words(doc, line_num: int, line: str) -> List[Dict[str, Any]]:
+        """Collect STE word violations from one parsed line"""
+        flagged = []
+        for token in doc:
+            if token._.was_replaced:
+                flagged.append({
+                    "line": line_num,
+                    "original": token.text,
+                    "pos": token.pos_,
+                    "replacement": token._.ste_replacement,
+                    "context": line
+                })
+        return flagged
+    
+    @staticmethod
+    def _scan_passive_voice(doc: "Doc", para_num: int, attrs: List[int]) -> List[Dict[str, Any]]:
+        """Collect passive voice phrases from one parsed paragraph; attrs is [TAG, DEP, HEAD]"""
         passive_results = []
+        strings = doc.vocab.strings
+        arr = doc.to_array(attrs)
         
-        for para_num, para in enumerate(paragraphs, start=1):
-            try:
-                doc = self.nlp(para)
-                for sent in doc.sents:
-                    for token in sent:
-                        if token.tag_ == "VBN":
-                            auxiliaries = [child.text for child in token.children 
-                                         if child.dep_ in ("aux", "auxpass")]
-                            if auxiliaries:
-                                phrase = " ".join(auxiliaries + [token.text])
-                                passive_results.append({
-                                    "paragraph": para_num,
-                                    "phrase": phrase.strip(),
-                                    "sentence": sent.text.strip()
-                                })
-                                break
-            except Exception as e:
-                logger.warning(f"Error processing paragraph {para_num}: {str(e)}")
+        # HEAD is stored as an offset from each token; turn it into an index
+        index = np.arange(len(doc))
+        heads = index + arr[:, 2].view(np.int64)
+        is_aux = np.isin(arr[:, 1], [strings["aux"], strings["auxpass"]]) & (heads != index)
+        has_aux = np.zeros(len(doc), dtype=bool)
+        has_aux[heads[is_aux]] = True
+        # VBN tokens with at least one aux/auxpass child, in document order
+        candidates = np.flatnonzero((arr[:, 0] == strings["VBN"]) & has_aux)
         
-        return CheckResult(
-            category="Passive Voice",
-            violations=passive_results,
-            success_message="✅ No passive voice detected."
-        )
+        for sent in doc.sents:
+            # Only the first passive verb of each sentence is reported
+            k = np.searchsorted(candidates, sent.start)
+            if k == len(candidates) or candidates[k] >= sent.end:
+                continue
+            i = candidates[k]
+            auxiliaries = [doc[j].text for j in np.flatnonzero(is_aux & (heads == i))]
+            phrase = " ".join(auxiliaries + [doc[i].text])
+            passive_results.append({
+                "paragraph": para_num,
+                "phrase": phrase.strip(),
+                "sentence": sent.text.strip()
+            })
+        return passive_results
     
     def _check_punctuation(self, paragraphs: List[str]) -> CheckResult:
         """Check for punctuation violations"""
         try:
+            from components.punctuation import detect_punctuation_violations
             violations = detect_punctuation_violations(paragraphs)
             return CheckResult(
                 category="Punctuation",
@@ -169,6 +238,7 @@ class STEDocumentProcessor:
     def _check_hyphenation(self, paragraphs: List[str]) -> CheckResult:
         """Check for hyphenation suggestions"""
         try:
+            from components.hyphen_suggester import detect_hyphen_suggestions
             suggestions = detect_hyphen_suggestions(paragraphs)
             violations = []
             
@@ -197,6 +267,7 @@ class STEDocumentProcessor:
     def _check_si_units(self, paragraphs: List[str]) -> CheckResult:
         """Check for SI unit compliance"""
         try:
+            from components.si_unit_checker import check_si_units
             violations = check_si_units(paragraphs)
             return CheckResult(
                 category="SI Units",
@@ -214,6 +285,7 @@ class STEDocumentProcessor:
     def _check_multiword_nouns(self, paragraphs: List[str]) -> CheckResult:
         """Check for multi-word noun violations"""
         try:
+            from components.multiword_noun_checker import MultiwordNounChecker
             checker = MultiwordNounChecker()
             checker.process(paragraphs)
             report_lines = checker.report()
@@ -233,6 +305,59 @@ class STEDocumentProcessor:
                 error_message=f"Error checking multi-word nouns: {str(e)}"
             )
 
+@st.cache_resource(show_spinner=False)
+def _memo(name: str) -> Tuple[Dict[Any, Any], threading.Lock]:
+    """Process-wide store of successful results for name, shared across reruns.
+
+    Only called on the script thread; pool threads get plain values.
+    """
+    return {}, threading.Lock()
+
+def analyze_text(text: str, on_progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, CheckResult]:
+    """Run all STE checks on text, memoized so reruns on the same text are free"""
+    cache, lock = _memo("analysis")
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with lock:
+        results = cache.get(key)
+    if results is None:
+        results = STEDocumentProcessor().process_document(text, on_progress)
+        # A failed check may be transient, so only clean runs are kept
+        if not any(result.error_message for result in results.values()):
+            with lock:
+                cache[key] = results
+    return results
+
+def _rewrite_and_polish(sentence: str):
+    """Rewrite and polish one sentence, returning (active, result, error).
+
+    Runs on pool threads, which have no Streamlit script context, so it must
+    not touch st.* or any st.cache_* function.
+    """
+    from components.llm_utills import rewrite_to_active
+    from components.post_active_processor import process_active_and_polish
+    active = result = None
+    try:
+        active = rewrite_to_active(sentence)
+        result = process_active_and_polish(active)
+    except Exception as e:
+        return active, result, str(e)
+    return active, result, None
+
+def _rewrite_all(sentences: List[str]) -> Dict[str, Tuple[Any, Any, Optional[str]]]:
+    """Rewrite each sentence once per process; failed rewrites are retried next time"""
+    cache, lock = _memo("rewrite")
+    with lock:
+        rewrites = {sentence: cache[sentence] for sentence in sentences if sentence in cache}
+    missing = [sentence for sentence in dict.fromkeys(sentences) if sentence not in rewrites]
+    if missing:
+        # The rewrites are independent LLM calls, so fetch them all at once
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            rewrites.update(zip(missing, executor.map(_rewrite_and_polish, missing)))
+        with lock:
+            cache.update((sentence, rewrites[sentence]) for sentence in missing
+                         if rewrites[sentence][2] is None)
+    return rewrites
+
 def display_results(results: Dict[str, CheckResult], processor: STEDocumentProcessor):
     """Display results in an organized manner with expandable sections"""
     
@@ -291,72 +416,78 @@ def display_results(results: Dict[str, CheckResult], processor: STEDocumentProce
 
 def get_category_icon(category: str) -> str:
     """Get appropriate icon for each category"""
-    icons = {
-        "STE Word Replacement": "🛠️",
-        "Passive Voice": "⚠️",
-        "Punctuation": "🔤",
-        "Hyphenation": "➖",
-        "SI Units": "📏",
-        "Multi-word Nouns": "🧠"
-    }
-    return icons.get(category, "📋")
+    return CATEGORY_ICONS.get(category, "📋")
 
 def display_ste_violations(violations: List[Dict]):
     """Display STE word replacement violations"""
+    lines = []
     for entry in violations:
-        st.markdown(f"🔹 **Line {entry['line']}**: `{entry['original']}` ({entry['pos']}) → `{entry['replacement']}`")
-        st.markdown(f"   *Context: {entry['context']}*")
+        lines.append(f"🔹 **Line {entry['line']}**: `{entry['original']}` ({entry['pos']}) → `{entry['replacement']}`")
+        lines.append(f"   *Context: {entry['context']}*")
+    st.markdown("\n\n".join(lines))
 
 def display_passive_voice_violations(violations: List[Dict], processor: STEDocumentProcessor):
     """Display passive voice violations with rewrites"""
+    # Called on the script thread; the pool threads only run plain helpers
+    with st.spinner("Rewriting to active voice..."):
+        rewrites = _rewrite_all([info['sentence'] for info in violations])
+    
     for i, info in enumerate(violations, 1):
+        active, result, error = rewrites[info['sentence']]
         st.markdown(f"**{i}.** Passive Phrase: `{info['phrase']}`")
         st.markdown(f"➡️ **Original**: *{info['sentence']}*")
         
-        try:
-            with st.spinner("Rewriting to active voice..."):
-                active = rewrite_to_active(info['sentence'])
-                st.markdown(f"🔁 **Active Voice**: *{active}*")
-                
-                result = process_active_and_polish(active)
-                if result:
-                    st.markdown(f"🟡 **With STE highlights**: {result.get('highlighted_ste', 'N/A')}")
-                    st.markdown(f"🛠️ **Replacements**: `{result.get('replacements', 'None')}`")
-                    st.markdown(f"✨ **Final polished**: *{result.get('final_polished', active)}*")
-        except Exception as e:
-            st.error(f"Error rewriting sentence: {str(e)}")
+        if active is not None:
+            st.markdown(f"🔁 **Active Voice**: *{active}*")
+        if result:
+            st.markdown(f"🟡 **With STE highlights**: {result.get('highlighted_ste', 'N/A')}")
+            st.markdown(f"🛠️ **Replacements**: `{result.get('replacements', 'None')}`")
+            st.markdown(f"✨ **Final polished**: *{result.get('final_polished', active)}*")
+        if error is not None:
+            st.error(f"Error rewriting sentence: {error}")
         
         st.markdown("---")
 
 def display_punctuation_violations(violations: List[Dict]):
     """Display punctuation violations"""
+    lines = []
     for v in violations:
         line = v.get("line_number", "Unknown")
         text = v.get("text", "")
         punctuation = v.get("punctuation", "")
-        st.markdown(f"⚠️ **Line {line}**: contains `{punctuation}` — *{text}*")
-        st.markdown(f"💡 **Suggestion**: Avoid using `{punctuation}` — rewrite using a period or conjunction.")
+        lines.append(f"⚠️ **Line {line}**: contains `{punctuation}` — *{text}*")
+        lines.append(f"💡 **Suggestion**: Avoid using `{punctuation}` — rewrite using a period or conjunction.")
+    st.markdown("\n\n".join(lines))
 
 def display_hyphenation_violations(violations: List[Dict]):
     """Display hyphenation suggestions"""
+    lines = []
     for entry in violations:
-        st.markdown(f"💡 **Line {entry['line_number']}**: `{entry['suggestion']}` instead of `{entry['original']}`")
-        st.markdown(f"   *Context: {entry['context']}*")
+        lines.append(f"💡 **Line {entry['line_number']}**: `{entry['suggestion']}` instead of `{entry['original']}`")
+        lines.append(f"   *Context: {entry['context']}*")
+    st.markdown("\n\n".join(lines))
 
 def display_si_unit_violations(violations: List[Dict]):
     """Display SI unit violations"""
+    lines = []
     for entry in violations:
         line = entry.get("line", "Unknown")
         text = entry.get("text", "")
         suggestion = entry.get("suggestion", "")
-        st.markdown(f"💡 **Line {line}**: `{suggestion}` in — *{text}*")
+        lines.append(f"💡 **Line {line}**: `{suggestion}` in — *{text}*")
         for issue in entry.get("issues", []):
-            st.markdown(f"   ⚠️ {issue}")
+            lines.append(f"   ⚠️ {issue}")
+    st.markdown("\n\n".join(lines))
 
 def display_multiword_noun_violations(violations: List[Dict]):
     """Display multi-word noun violations"""
-    for entry in violations:
-        st.markdown(entry["report_line"])
+    st.markdown("\n\n".join(entry["report_line"] for entry in violations))
+
+def dump_json(data: Dict[str, Any]) -> str:
+    """Serialize a report to indented JSON, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, indent=2)
 
 def generate_report(results: Dict[str, CheckResult], filename: str, doc_stats: Dict) -> Dict[str, str]:
     """Generate comprehensive reports in multiple formats"""
@@ -391,7 +522,8 @@ def generate_report(results: Dict[str, CheckResult], filename: str, doc_stats: D
         }
     
     # Generate Markdown Report
-    md_report = f"""# STE Analysis Report
+    md_out = io.StringIO()
+    md_out.write(f"""# STE Analysis Report
 
 **Document:** {filename}  
 **Generated:** {timestamp}  
@@ -410,60 +542,61 @@ def generate_report(results: Dict[str, CheckResult], filename: str, doc_stats: D
 
 ## Detailed Results
 
-"""
+""")
     
     for category, result in results.items():
         icon = get_category_icon(category)
-        md_report += f"### {icon} {category}\n"
+        md_out.write(f"### {icon} {category}\n")
         
         if result.error_message:
-            md_report += f"**Error:** {result.error_message}\n\n"
+            md_out.write(f"**Error:** {result.error_message}\n\n")
             continue
             
         if not result.violations:
-            md_report += f"{result.success_message}\n\n"
+            md_out.write(f"{result.success_message}\n\n")
             continue
             
-        md_report += f"**Issues Found:** {len(result.violations)}\n\n"
+        md_out.write(f"**Issues Found:** {len(result.violations)}\n\n")
         
         # Add category-specific details
         if category == "STE Word Replacement":
             for entry in result.violations:
-                md_report += f"- **Line {entry['line']}:** `{entry['original']}` ({entry['pos']}) → `{entry['replacement']}`\n"
-                md_report += f"  - *Context:* {entry['context']}\n"
+                md_out.write(f"- **Line {entry['line']}:** `{entry['original']}` ({entry['pos']}) → `{entry['replacement']}`\n")
+                md_out.write(f"  - *Context:* {entry['context']}\n")
         
         elif category == "Passive Voice":
             for i, entry in enumerate(result.violations, 1):
-                md_report += f"- **{i}.** Passive phrase: `{entry['phrase']}`\n"
-                md_report += f"  - *Sentence:* {entry['sentence']}\n"
+                md_out.write(f"- **{i}.** Passive phrase: `{entry['phrase']}`\n")
+                md_out.write(f"  - *Sentence:* {entry['sentence']}\n")
         
         elif category == "Punctuation":
             for entry in result.violations:
-                md_report += f"- **Line {entry.get('line_number', 'Unknown')}:** Contains `{entry.get('punctuation', '')}` in: {entry.get('text', '')}\n"
+                md_out.write(f"- **Line {entry.get('line_number', 'Unknown')}:** Contains `{entry.get('punctuation', '')}` in: {entry.get('text', '')}\n")
         
         elif category == "Hyphenation":
             for entry in result.violations:
-                md_report += f"- **Line {entry['line_number']}:** Use `{entry['suggestion']}` instead of `{entry['original']}`\n"
+                md_out.write(f"- **Line {entry['line_number']}:** Use `{entry['suggestion']}` instead of `{entry['original']}`\n")
         
         elif category == "SI Units":
             for entry in result.violations:
-                md_report += f"- **Line {entry.get('line', 'Unknown')}:** {entry.get('suggestion', '')}\n"
+                md_out.write(f"- **Line {entry.get('line', 'Unknown')}:** {entry.get('suggestion', '')}\n")
                 for issue in entry.get('issues', []):
-                    md_report += f"  - {issue}\n"
+                    md_out.write(f"  - {issue}\n")
         
         elif category == "Multi-word Nouns":
             for entry in result.violations:
-                md_report += f"- {entry['report_line']}\n"
+                md_out.write(f"- {entry['report_line']}\n")
         
-        md_report += "\n"
+        md_out.write("\n")
     
-    md_report += f"""
+    md_out.write(f"""
 ---
 *Report generated by STE Document Checker on {timestamp}*
-"""
+""")
     
     # Generate Plain Text Report
-    txt_report = f"""STE ANALYSIS REPORT
+    txt_out = io.StringIO()
+    txt_out.write(f"""STE ANALYSIS REPORT
 {'='*50}
 
 Document: {filename}
@@ -486,44 +619,44 @@ Overall Compliance: {compliance_rate:.1f}%
 DETAILED RESULTS
 {'-'*20}
 
-"""
+""")
     
     for category, result in results.items():
-        txt_report += f"{category.upper()}\n{'-' * len(category)}\n"
+        txt_out.write(f"{category.upper()}\n{'-' * len(category)}\n")
         
         if result.error_message:
-            txt_report += f"Error: {result.error_message}\n\n"
+            txt_out.write(f"Error: {result.error_message}\n\n")
             continue
             
         if not result.violations:
-            txt_report += f"{result.success_message}\n\n"
+            txt_out.write(f"{result.success_message}\n\n")
             continue
             
-        txt_report += f"Issues Found: {len(result.violations)}\n\n"
+        txt_out.write(f"Issues Found: {len(result.violations)}\n\n")
         
         # Add simplified details for text format
         for i, violation in enumerate(result.violations, 1):
             if category == "STE Word Replacement":
-                txt_report += f"{i}. Line {violation['line']}: {violation['original']} -> {violation['replacement']}\n"
+                txt_out.write(f"{i}. Line {violation['line']}: {violation['original']} -> {violation['replacement']}\n")
             elif category == "Passive Voice":
-                txt_report += f"{i}. {violation['phrase']} in: {violation['sentence']}\n"
+                txt_out.write(f"{i}. {violation['phrase']} in: {violation['sentence']}\n")
             elif category == "Punctuation":
-                txt_report += f"{i}. Line {violation.get('line_number', 'Unknown')}: {violation.get('text', '')}\n"
+                txt_out.write(f"{i}. Line {violation.get('line_number', 'Unknown')}: {violation.get('text', '')}\n")
             elif category == "Hyphenation":
-                txt_report += f"{i}. Line {violation['line_number']}: {violation['suggestion']}\n"
+                txt_out.write(f"{i}. Line {violation['line_number']}: {violation['suggestion']}\n")
             elif category == "SI Units":
-                txt_report += f"{i}. Line {violation.get('line', 'Unknown')}: {violation.get('suggestion', '')}\n"
+                txt_out.write(f"{i}. Line {violation.get('line', 'Unknown')}: {violation.get('suggestion', '')}\n")
             elif category == "Multi-word Nouns":
-                txt_report += f"{i}. {violation['report_line']}\n"
+                txt_out.write(f"{i}. {violation['report_line']}\n")
         
-        txt_report += "\n"
+        txt_out.write("\n")
     
-    txt_report += f"\nReport generated by STE Document Checker on {timestamp}\n"
+    txt_out.write(f"\nReport generated by STE Document Checker on {timestamp}\n")
     
     return {
-        "json": json.dumps(json_report, indent=2),
-        "markdown": md_report,
-        "text": txt_report,
+        "json": dump_json(json_report),
+        "markdown": md_out.getvalue(),
+        "text": txt_out.getvalue(),
         "base_filename": base_filename
     }
 
@@ -541,14 +674,19 @@ def save_reports_automatically(reports: Dict[str, str], base_filename: str) -> L
         "text": "txt"
     }
     
-    for format_name, extension in formats.items():
-        if format_name in reports:
-            filename = f"{base_filename}_report_{timestamp}.{extension}"
-            filepath = reports_dir / filename
-            
+    # Write the reports side by side; results are collected in format order
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        writes = []
+        for format_name, extension in formats.items():
+            if format_name in reports:
+                filename = f"{base_filename}_report_{timestamp}.{extension}"
+                filepath = reports_dir / filename
+                future = executor.submit(filepath.write_text, reports[format_name], encoding='utf-8')
+                writes.append((format_name, filepath, future))
+        
+        for format_name, filepath, future in writes:
             try:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(reports[format_name])
+                future.result()
                 saved_files.append(str(filepath))
             except Exception as e:
                 st.error(f"Failed to save {format_name} report: {str(e)}")
@@ -564,13 +702,20 @@ def process_uploaded_file(uploaded_file) -> Optional[str]:
         st.error("❌ Unsupported file format. Please upload a .txt, .pdf, or .adoc file.")
         return None
     
-    temp_path = Path(f"uploaded_temp_{int(time.time())}{suffix}")
+    # Plain-text formats need no extraction step, just decode the upload
+    if suffix in (".txt", ".adoc"):
+        return uploaded_file.getvalue().decode("utf-8", errors="replace")
+    
+    temp_path = None
     
     try:
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.read())
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            temp_path = Path(f.name)
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
         
         with st.spinner(f"Extracting text from {original_name}..."):
+            from components.ste_word_checker import extract_text_from_file
             input_text = extract_text_from_file(str(temp_path))
             
         return input_text
@@ -582,7 +727,7 @@ def process_uploaded_file(uploaded_file) -> Optional[str]:
         st.error(f"❌ Unexpected error: {str(e)}")
         return None
     finally:
-        if temp_path.exists():
+        if temp_path is not None and temp_path.exists():
             try:
                 os.remove(temp_path)
             except Exception as e:
@@ -638,8 +783,8 @@ def main():
         
         if input_text:
             # Store document stats
-            lines = len(input_text.split('\n'))
-            words = len(input_text.split())
+            lines = input_text.count('\n') + 1
+            words = sum(1 for _ in WORD_RE.finditer(input_text))
             chars = len(input_text)
             
             st.session_state.doc_stats = {
@@ -655,10 +800,24 @@ def main():
             
             # Initialize processor and run checks
             if st.button("🚀 Run STE Analysis", type="primary"):
-                processor = STEDocumentProcessor()
+                try:
+                    processor = STEDocumentProcessor()
+                except Exception as e:
+                    st.error(f"Failed to initialize components: {str(e)}")
+                    st.stop()
+                
+                # Use progress bar for better UX; it is driven from this thread
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+                status_text.text("Running STE checks...")
+                
+                def show_progress(done: int, total: int, check_label: str):
+                    status_text.text(f"Finished {check_label} check...")
+                    progress_bar.progress(done / total)
                 
-                with st.spinner("Processing document..."):
-                    results = processor.process_document(input_text)
+                results = analyze_text(input_text, on_progress=show_progress)
+                progress_bar.empty()
+                status_text.empty()
                 
                 # Display results
                 display_results(results, processor)
@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import pypandoc
 
 input_dir = './Mayank'  # Change to your target directory
@@ -6,17 +7,22 @@ output_dir = './converted'  # Output folder
 
 os.makedirs(output_dir, exist_ok=True)
 
-for filename in os.listdir(input_dir):
-    if filename.endswith('.odt'):
-        input_path = os.path.join(input_dir, filename)
-        output_filename = os.path.splitext(filename)[0] + '.docx'
-        output_path = os.path.join(output_dir, output_filename)
+def convert(filename):
+    input_path = os.path.join(input_dir, filename)
+    output_filename = os.path.splitext(filename)[0] + '.docx'
+    output_path = os.path.join(output_dir, output_filename)
 
-        try:
-            print(f"Converting: {filename}")
-            pypandoc.convert_file(input_path, 'docx', outputfile=output_path)
-            print(f"Saved to: {output_path}")
-        except Exception as e:
-            print(f"Failed to convert {filename}: {e}")
+    try:
+        print(f"Converting: {filename}")
+        pypandoc.convert_file(input_path, 'docx', outputfile=output_path)
+        print(f"Saved to: {output_path}")
+    except Exception as e:
+        print(f"Failed to convert {filename}: {e}")
+
+# Each conversion runs in its own pandoc process, so threads are enough to
+# keep several going at once
+filenames = [filename for filename in os.listdir(input_dir) if filename.endswith('.odt')]
+with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as executor:
+    list(executor.map(convert, filenames))
 
 print("Batch conversion complete.")